@@ -19,12 +19,25 @@ this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
 import argparse
+import hashlib
+import json
 import logging
 import multiprocessing as mp
+import os
 import re
 import shutil
+import socket
+import subprocess
 import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import islice
+from multiprocessing.util import Finalize
 from pathlib import Path
 from typing import Any
 
@@ -40,8 +53,135 @@ from slugify import slugify
 
 logging.basicConfig(level=logging.INFO, handlers=[RichHandler()])
 
-CONTENT_SUFFIXES = [".md"]
-ASSET_SUFFIXES = [".jpg", ".png"]
+CONTENT_SUFFIXES = frozenset({".md"})
+ASSET_SUFFIXES = frozenset({".jpg", ".png"})
+_KNOWN_SUFFIXES = CONTENT_SUFFIXES | ASSET_SUFFIXES
+
+ORG_LINK = r"""
+        \[
+            \[file:
+                (?P<link> [^\]]+?)
+            \]
+            (?:
+                \[
+                    (?P<title> [^\]]+?)
+                \]
+            )?
+        \]
+"""
+_ORG_LINK_RE = re.compile(ORG_LINK, re.VERBOSE)
+
+# Stems already in slug form, which can skip the full slugify machinery.
+_SAFE_STEM = re.compile(r"^[a-z0-9_]+$")
+
+PANDOC_CACHE_DIR = Path("cache/pandoc")
+# Bump whenever the pandoc format or arguments change, so stale entries miss.
+PANDOC_ARGS_TAG = b"|wikilinks_title_after_pipe|wrap=none|v2"
+
+_PANDOC_SERVER: subprocess.Popen | None = None
+_PANDOC_SERVER_URL = ""
+
+_WORKER_VAULT: "VaultConverter | None" = None
+
+# Threads per worker process for overlapping pandoc conversions.
+_PANDOC_THREADS = 4
+
+
+def init_worker(vault: "VaultConverter"):
+    """
+    Prime a pool worker: record the shared vault and start its pandoc server.
+
+    Receiving the vault once here keeps the full vault and asset maps out of
+    every per-note task payload.
+    """
+    global _WORKER_VAULT
+    _WORKER_VAULT = vault
+    start_pandoc_server()
+
+
+def start_pandoc_server():
+    """
+    Start a pandoc server owned by this process, if pandoc supports one.
+
+    Meant as a pool worker initializer, so every note converted in that worker
+    shares a single pandoc process instead of paying pandoc startup per note.
+    Quietly does nothing when the server cannot start; ``pandoc_to_org`` then
+    falls back to one subprocess per call.
+    """
+    global _PANDOC_SERVER, _PANDOC_SERVER_URL
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    try:
+        _PANDOC_SERVER = subprocess.Popen(
+            ["pandoc", "server", f"--port={port}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        logging.debug("Could not launch pandoc; falling back to pypandoc")
+        _PANDOC_SERVER = None
+        return
+
+    Finalize(None, stop_pandoc_server, exitpriority=0)
+
+    for _ in range(50):
+        if _PANDOC_SERVER.poll() is not None:
+            # Probably a pandoc too old for the server subcommand.
+            logging.debug("pandoc server exited; falling back to pypandoc")
+            _PANDOC_SERVER = None
+            return
+
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/version", timeout=1)
+            _PANDOC_SERVER_URL = f"http://127.0.0.1:{port}"
+            return
+        except urllib.error.URLError:
+            time.sleep(0.1)
+
+    logging.debug("pandoc server never came up; falling back to pypandoc")
+    stop_pandoc_server()
+
+
+def stop_pandoc_server():
+    """Shut down this process's pandoc server, if one is running."""
+    global _PANDOC_SERVER, _PANDOC_SERVER_URL
+
+    if _PANDOC_SERVER is not None and _PANDOC_SERVER.poll() is None:
+        _PANDOC_SERVER.terminate()
+
+    _PANDOC_SERVER = None
+    _PANDOC_SERVER_URL = ""
+
+
+def pandoc_to_org(markdown: str):
+    """Convert markdown text to org, reusing the pandoc server when available."""
+    if _PANDOC_SERVER_URL:
+        payload = json.dumps(
+            {
+                "text": markdown,
+                "from": "markdown+wikilinks_title_after_pipe",
+                "to": "org",
+                "wrapText": "none",
+            }
+        ).encode("utf-8")
+        request = urllib.request.Request(
+            _PANDOC_SERVER_URL,
+            data=payload,
+            headers={"Content-Type": "application/json", "Accept": "text/plain"},
+        )
+
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.read().decode("utf-8")
+
+    return pypandoc.convert_text(
+        markdown,
+        "org",
+        format="markdown+wikilinks_title_after_pipe",
+        extra_args=["--wrap=none"],
+    )
 
 
 @dataclass
@@ -49,55 +189,77 @@ class NoteConverter:
     input_dir: Path
     output_dir: Path
     source: Path
-    md_note: frontmatter.Post = field(init=False)
-    slug: str = field(init=False)
-    _org_content: str = field(init=False)
+    _org_content: str = field(default="", init=False)
 
-    def __post_init__(self):
-        self.md_note = frontmatter.loads(self.source.read_text(encoding="utf-8"))
-        self.slug = slugify(self.source.stem, separator="_")
-        self._org_content = ""
+    _ORG_TMPL = ":PROPERTIES:\n:ID: {org_id}\n:END:\n{org_meta}\n\n{body}"
+
+    @cached_property
+    def _parsed(self) -> tuple[str, dict[str, Any]]:
+        """Parse the markdown note on first use, keeping only what we need."""
+        post = frontmatter.loads(self.source.read_text(encoding="utf-8"))
+
+        return post.content, dict(post.metadata)
+
+    @property
+    def content(self):
+        """Return the markdown body of this note."""
+        return self._parsed[0]
+
+    @cached_property
+    def slug(self):
+        stem = self.source.stem.lower()
+
+        if _SAFE_STEM.match(stem):
+            return stem
+
+        return slugify(self.source.stem, separator="_")
 
     @property
     def meta(self):
         """Return the note metadata."""
-        return self.md_note.metadata
+        return self._parsed[1]
 
-    @property
+    @cached_property
     def org_id(self):
         return self.slug
 
-    @property
+    @cached_property
     def org_path(self):
         timestamp = self.meta["created"].strftime("%Y%m%d%H%M%S")
 
         return f"{timestamp}-{self.slug}.org"
 
-    @property
+    @cached_property
+    def section(self):
+        """Return the top-level vault folder holding this note."""
+        # Sections come from a small fixed set of folders, so intern them
+        # rather than keeping a duplicate string alive per note.
+        return sys.intern(self.source.relative_to(self.input_dir).parts[0])
+
+    @cached_property
     def title(self):
         """Return the title associated with this note."""
-        if title := self.md_note.get("title"):
+        if title := self.meta.get("title"):
             return title
 
         return self.source.stem
 
     def as_org(self):
         """Return the org file version of this note."""
-        org_content = self.org_content()
-        frontmatter = "\n".join([f"#+{k}: {v}" for k, v in self.get_org_meta().items()])
+        org_meta = "\n".join(f"#+{k}: {v}" for k, v in self.org_meta.items())
 
-        return (
-            f":PROPERTIES:\n:ID: {self.org_id}\n:END:\n{frontmatter}\n\n{org_content}"
+        return self._ORG_TMPL.format(
+            org_id=self.org_id, org_meta=org_meta, body=self.org_content()
         )
 
-    def get_org_meta(self):
+    @cached_property
+    def org_meta(self):
         """Return the dictionary of metadata needed for org-roam files."""
-        section = self.source.relative_to(self.input_dir).parts[0]
-        logging.debug("Section: %s", section)
+        logging.debug("Section: %s", self.section)
 
         return {
             "title": self.title,
-            "filetags": f":{section}:",
+            "filetags": sys.intern(f":{self.section}:"),
         }
 
     def org_content(self):
@@ -113,21 +275,26 @@ class NoteConverter:
         return f"[[id:{self.org_id}][{link_text}]]"
 
     def _generate_org_content(self):
-        cache_file = Path(f"cache/pandoc/") / self.org_path
+        key = hashlib.sha256(
+            self.content.encode("utf-8") + PANDOC_ARGS_TAG
+        ).hexdigest()[:32]
+        cache_file = PANDOC_CACHE_DIR / f"{key}.org"
 
-        if (
-            cache_file.is_file()
-            and cache_file.stat().st_mtime > self.source.stat().st_mtime
-        ):
+        if cache_file.is_file():
             transformed_md = cache_file.read_text(encoding="utf-8")
         else:
-            transformed_md = pypandoc.convert_text(
-                self.md_note.content,
-                "org",
-                format="markdown+wikilinks_title_after_pipe",
-                extra_args=["--wrap=none"],
-            )
-            cache_file.write_text(self._org_content, encoding="utf-8")
+            transformed_md = pandoc_to_org(self.content)
+            PANDOC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+            # Notes with identical bodies share a cache file, so write via a
+            # unique temp file and rename; concurrent readers never see a
+            # truncated entry.
+            fd, tmp_name = tempfile.mkstemp(dir=PANDOC_CACHE_DIR, suffix=".tmp")
+
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                tmp_file.write(transformed_md)
+
+            os.replace(tmp_name, cache_file)
 
         return transformed_md
 
@@ -143,6 +310,15 @@ class VaultConverter:
     vault_map: VaultMap
     asset_map: AssetMap
     output_dir: Path
+    _by_stem: dict[str, list[Path]] = field(init=False)
+    _link_cache: dict[tuple[str, str | None], str] = field(init=False)
+
+    def __post_init__(self):
+        self._by_stem = {}
+        self._link_cache = {}
+
+        for path in self.vault_map:
+            self._by_stem.setdefault(path.stem, []).append(path)
 
     def from_stem(self, stem: str):
         """
@@ -152,7 +328,7 @@ class VaultConverter:
 
         Raises an exception if there is more than one match.
         """
-        matches = [path for path in self.vault_map if path.stem == stem]
+        matches = self._by_stem.get(stem, [])
 
         if not matches:
             logging.debug("No note stem matched '%s'", stem)
@@ -167,6 +343,18 @@ class VaultConverter:
         return self.vault_map[matches[0]]
 
     def ensure_link(self, requested_link: str, link_text: str = None):
+        """Resolve a requested link, remembering the answer for repeats."""
+        cache_key = (requested_link, link_text)
+
+        if resolved := self._link_cache.get(cache_key):
+            return resolved
+
+        resolved = self._resolve_link(requested_link, link_text)
+        self._link_cache[cache_key] = resolved
+
+        return resolved
+
+    def _resolve_link(self, requested_link: str, link_text: str = None):
         base = requested_link.split("/")[-1]
 
         if note := self.from_stem(base):
@@ -174,23 +362,75 @@ class VaultConverter:
 
         link_path = Path(requested_link)
 
-        if asset_path := self.asset_map.get(link_path):
-            output_path = self.output_dir / link_path
-
-            if not output_path.is_file():
-                logging.info("Copying asset file: %s", asset_path)
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy(asset_path, output_path)
-
+        if link_path in self.asset_map:
             return f"[[{link_path}]]"
 
-        logging.warning("Requested link is not in vault, returning placeholder: %s")
+        logging.warning(
+            "Requested link is not in vault, returning placeholder: %s",
+            requested_link,
+        )
 
         if link_text:
             return f"/{link_text}/"
 
         return f"/{requested_link}/"
 
+    def copy_assets(self):
+        """
+        Materialize every vault asset in the output directory.
+
+        Runs as a pre-pass before the worker pool, so link resolution never
+        blocks on disk I/O. Hardlinks where the filesystem allows — a
+        constant-time metadata operation — and falls back to a plain copy.
+        """
+        for link_path, asset_path in self.asset_map.items():
+            output_path = self.output_dir / link_path
+
+            if output_path.is_file():
+                continue
+
+            logging.debug("Copying asset file: %s", asset_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            try:
+                os.link(asset_path, output_path)
+            except OSError:
+                shutil.copyfile(asset_path, output_path)
+
+
+def iter_files(root: Path):
+    """
+    Walk root recursively with os.scandir, yielding files worth looking at.
+
+    scandir hands back directory entries with type information already
+    attached, so the walk avoids the per-file stat calls and Path churn of
+    ``Path.glob("**/*.*")``. Ignored directories — meta sections starting
+    with an underscore, and ``config`` which was converted from Org anyways —
+    are pruned here, before descending, so their subtrees cost nothing.
+    """
+    stack = [os.fspath(root)]
+
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.startswith("_") or entry.name == "config":
+                        continue
+
+                    stack.append(entry.path)
+                    continue
+
+                if os.path.splitext(entry.name)[1] in _KNOWN_SUFFIXES:
+                    yield Path(entry.path)
+
+
+def batched(iterable, size: int):
+    """Yield lists of up to size items from iterable, in order."""
+    iterator = iter(iterable)
+
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 def parse_commandline_arguments():
     """Parse the commandline arguments."""
@@ -223,7 +463,7 @@ def main():
     asset_map = {}
     vault_map = {}
 
-    for path in input_dir.glob("**/*.*"):
+    for path in iter_files(input_dir):
         vault_path = path.relative_to(input_dir)
 
         if path.suffix in ASSET_SUFFIXES:
@@ -232,48 +472,67 @@ def main():
             continue
 
         if path.suffix in CONTENT_SUFFIXES:
-            if path.parent.stem.startswith("_"):
-                continue
-
             if path.stem.startswith("_"):
-                # Ignore meta sections for Obsidian and meta files for Hugo.
-                continue
-
-            if "/config/" in str(path):
-                # Ignore config files, which were converted from Org anyways.
+                # Ignore meta files for Hugo.
                 continue
 
             note = NoteConverter(input_dir, output_dir, path)
-            logging.debug("Loaded note: %s", note.title)
+            logging.debug("Loaded note: %s", vault_path)
             vault_map[vault_path] = note
 
     vault = VaultConverter(vault_map, asset_map, output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    vault.copy_assets()
 
-    with mp.Pool(processes=mp.cpu_count()) as pool:
-        pool.map(
-            process_note,
-            [(converter, vault) for converter in vault.vault_map.values()],
-        )
+    batch_size = max(1, len(vault.vault_map) // (4 * mp.cpu_count()))
+
+    with mp.Pool(
+        processes=mp.cpu_count(), initializer=init_worker, initargs=(vault,)
+    ) as pool:
+        with Progress() as progress:
+            converting = progress.add_task("Converting", total=len(vault.vault_map))
+
+            for done in pool.imap_unordered(
+                process_notes, batched(vault.vault_map.values(), batch_size)
+            ):
+                progress.update(converting, advance=done)
+
+        # Let workers exit normally so their pandoc-server finalizers run;
+        # the context manager alone terminates them mid-cleanup.
+        pool.close()
+        pool.join()
+
+
+def process_notes(converters: list[NoteConverter]):
+    """
+    Convert a batch of notes, overlapping their pandoc waits with threads.
+
+    A worker spends most of each note waiting on pandoc, not on its own CPU,
+    so a few threads per process keep several conversions in flight at once.
+    Returns the batch size, for the caller's progress accounting.
+    """
+    with ThreadPoolExecutor(max_workers=_PANDOC_THREADS) as executor:
+        for _ in executor.map(process_note, converters):
+            pass
 
+    return len(converters)
 
-def process_note(args):
-    converter, vault = args
-    logging.info("Processing note: %s", converter.source)
+
+def process_note(converter: NoteConverter):
+    vault = _WORKER_VAULT
+    logging.debug("Processing note: %s", converter.source)
     org_path = vault.output_dir / converter.org_path
+
+    try:
+        out_mtime = org_path.stat().st_mtime
+    except FileNotFoundError:
+        out_mtime = 0
+
+    if out_mtime > converter.source.stat().st_mtime:
+        logging.debug("Output is fresh, skipping: %s", org_path)
+        return
+
     org_content = converter.as_org()
-    ORG_LINK = r"""
-            \[
-                \[file:
-                    (?P<link> [^\]]+?)
-                \]
-                (?:
-                    \[
-                        (?P<title> [^\]]+?)
-                    \]
-                )?
-            \]
-    """
-    org_link = re.compile(ORG_LINK, re.VERBOSE)
 
     def find_link(match):
         logging.debug("<Match: %r, groups=%r>", match.group(), match.groups())
@@ -286,8 +545,17 @@ def process_note(args):
         logging.warning("Using original fallback for link: %s", fallback)
         return fallback
 
-    org_content = org_link.sub(find_link, org_content)
-    org_path.write_text(org_content, encoding="utf-8")
+    parts = []
+    last_end = 0
+
+    for match in _ORG_LINK_RE.finditer(org_content):
+        parts.append(org_content[last_end : match.start()])
+        parts.append(find_link(match))
+        last_end = match.end()
+
+    parts.append(org_content[last_end:])
+    org_content = "".join(parts)
+    org_path.write_bytes(org_content.encode("utf-8"))
 
 
 if __name__ == "__main__":